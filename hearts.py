@@ -1,4 +1,5 @@
 #!/usr/bin/env python
+import gc
 import math
 import os.path
 import random
@@ -11,8 +12,11 @@ from pyglet.window import key
 from pyglet import gl
 
 from high_score import HighScores
+from stats import Statistics
 
 DEBUG_VERSION = False
+# Defer garbage collection to level transitions and drop the fps display.
+PERFORMANCE_MODE = False
 
 
 log = logging.getLogger('hearts')
@@ -62,29 +66,29 @@ class Heart(object):
         size_count = len(self.sizes)
         self.beat = self.sizes[n % size_count]
 
-        remainder = n / size_count
+        remainder = n // size_count
         shift_count = len(self.shifts)
         self.shift = self.shifts[remainder % shift_count]
 
-        remainder = remainder / shift_count
+        remainder = remainder // shift_count
         self.image = self.images[remainder]
 
-    def __init__(self, mapX, mapY, n):
+        self.frames = len(self.beat)
+        self.selected_beat = [scale * 1.5 for scale in self.beat]
+
+    def __init__(self, mapX, mapY, n, batch=None):
         self.mapX = mapX
         self.mapY = mapY
         self.pickHeart(n)
-        self.sprite = pyglet.sprite.Sprite(self.image)
+        self.sprite = pyglet.sprite.Sprite(self.image, batch=batch)
         self.sprite.image.anchor_x = self.sprite.image.width // 2
         self.sprite.image.anchor_y = self.sprite.image.height // 2
+        self.sprite.set_position(self.totalWidth * self.mapX,
+                                 self.totalHeight * self.mapY)
         self.total_time = 0
         self.total_time += self.shift
         self.selected = False
 
-    def draw(self):
-        self.sprite.x = self.totalWidth * self.mapX
-        self.sprite.y = self.totalHeight * self.mapY
-        self.sprite.draw()
-
     sizes = ([0.8, 0.8, 0.8, 0.8, 0.8, 0.8, 0.8, 0.8, 0.8, 0.8, 0.8, 0.9, 1.0, 0.9],
              [0.8, 0.8, 0.8, 0.8, 0.9, 1.0, 0.9, 0.8, 0.8, 0.8, 0.8, 0.9, 1.0, 0.9])
     shifts = [0.0, 0.25, 0.5, 0.75]
@@ -92,13 +96,13 @@ class Heart(object):
 
     def update(self, dt):
         self.total_time += dt
-        cycle = (self.total_time % self.seconds) / self.seconds
-        frames = len(self.beat)
-        frame = int(frames * cycle)
-        scale = self.beat[frame]
+        frame = int(self.frames * (self.total_time % self.seconds) / self.seconds)
         if self.selected:
-            scale *= 1.5
-        self.sprite.scale = scale
+            scale = self.selected_beat[frame]
+        else:
+            scale = self.beat[frame]
+        if scale != self.sprite.scale:
+            self.sprite.scale = scale
 
     def isHit(self, x, y):
         return ((self.sprite.y - self.sprite.image.anchor_y < y < self.sprite.y + self.sprite.image.anchor_y) and
@@ -108,18 +112,29 @@ class Heart(object):
 class Game(object):
 
     update_freq = 1 / 60.
+    # A perf.AllocationCounter to count what update() and draw() allocate
+    # while playing, reset at the start of every level
+    allocations = None
 
     def updateOffsets(self):
-        self.pxHorizontalShift = window.width // 2
-        self.pxVerticalShift = window.height // 2
+        self.pxHorizontalShift = self.pxWindowWidth // 2
+        self.pxVerticalShift = self.pxWindowHeight // 2
         self.pxHorizontalShift -= Heart.totalWidth * self.mapWidth // 2
         self.pxVerticalShift -= Heart.totalHeight * self.mapHeight // 2
 
-    def __init__(self, level=0):
+    def __init__(self, width, height, level=0):
         self.game_is_over = False
+        self.playing = False
+        self.pxWindowWidth = width
+        self.pxWindowHeight = height
         pyglet.clock.schedule_interval(self.update, self.update_freq)
         self.start(level)
 
+    def resize(self, width, height):
+        self.pxWindowWidth = width
+        self.pxWindowHeight = height
+        self.updateOffsets()
+
     levels = [('Beginner', 4, 4),
               ('Easy', 4, 6),
               ('Normal', 6, 6),
@@ -131,32 +146,51 @@ class Game(object):
         self.time_in_level = 0
         self.level = level
         self.mode, self.mapWidth, self.mapHeight = self.levels[level]
-        heart_styles = range(self.mapHeight * self.mapWidth / 2) * 2
+        heart_styles = list(range(self.mapHeight * self.mapWidth // 2)) * 2
         random.shuffle(heart_styles)
         self.selected_heart = None
         self.hearts = []
+        self.batch = pyglet.graphics.Batch()
         for mapX in range(self.mapWidth):
             for mapY in range(self.mapHeight):
-                self.hearts.append(Heart(mapX, mapY, heart_styles.pop()))
+                self.hearts.append(Heart(mapX, mapY, heart_styles.pop(), self.batch))
+        self.updateOffsets()
+        if self.allocations is not None:
+            self.allocations.reset()
+        if PERFORMANCE_MODE:
+            gc.collect()
 
     @property
     def score(self):
         return self.time_in_level
 
     def update(self, dt):
+        counting = self.playing and self.allocations is not None
+        if counting:
+            self.allocations.start()
         self.time_in_level += dt
-        for heart in self.hearts:
-            heart.update(dt)
-        self.updateOffsets()
+        # Iterating would allocate a list iterator every frame
+        hearts = self.hearts
+        n = len(hearts)
+        while n:
+            n -= 1
+            hearts[n].update(dt)
+        if counting:
+            self.allocations.stop()
 
     def draw(self):
-        with gl_matrix():
-            if self.game_is_over:
-                pass
-            with gl_matrix():
-                gl.glTranslatef(self.pxHorizontalShift, self.pxVerticalShift, 0)
-                for heart in self.hearts:
-                    heart.draw()
+        counting = self.playing and self.allocations is not None
+        if counting:
+            self.allocations.start()
+        # gl_matrix() would allocate a generator every frame
+        gl.glPushMatrix()
+        try:
+            gl.glTranslatef(self.pxHorizontalShift, self.pxVerticalShift, 0)
+            self.batch.draw()
+        finally:
+            gl.glPopMatrix()
+        if counting:
+            self.allocations.stop()
 
     def on_mouse_release(self, x, y, button, modifiers):
         if button == pyglet.window.mouse.LEFT:
@@ -170,6 +204,8 @@ class Game(object):
                         heart is not self.selected_heart):
                         self.hearts.remove(heart)
                         self.hearts.remove(self.selected_heart)
+                        heart.sprite.delete()
+                        self.selected_heart.sprite.delete()
                         self.selected_heart = None
                     else:
                         if self.selected_heart is not None:
@@ -183,6 +219,7 @@ class Game(object):
 class Main(pyglet.window.Window):
 
     fps_display = None
+    game = None
 
     SCORE = object()
     PLAYING = object()
@@ -197,25 +234,27 @@ class Main(pyglet.window.Window):
         self.set_mouse_visible(True)
         self.set_icon(pyglet.image.load(
             os.path.join(pyglet.resource.location('MessageHeart.png').path, 'MessageHeart.png')))
-        self.game = Game()
+        self.game = Game(self.width, self.height)
         self.high_score = HighScores('hearts.score', self.game.modes)
+        self.stats = Statistics('hearts.stats')
         self.setState(self.SCORE)
-        self.fps_display = pyglet.clock.ClockDisplay()
-        self.fps_display.label.y = self.height - 50
-        self.fps_display.label.x = self.width - 170
+        if not PERFORMANCE_MODE:
+            self.fps_display = pyglet.clock.ClockDisplay()
+            self.fps_display.label.y = self.height - 50
+            self.fps_display.label.x = self.width - 170
 
     def on_draw(self):
         self.clear()
-        if self.state is self.START:
+        if self.state is self.PLAYING:
+            self.game.draw()
+        elif self.state is self.START:
             self.game.start(self.game.level)
             self.high_score.mode = self.game.mode
             self.setState(self.PLAYING)
-        elif self.state is self.SCORE:
+        else:
             with gl_matrix():
                 gl.glTranslatef(window.width / 2, window.height // 2, 0)
                 self.high_score.draw()
-        else:
-            self.game.draw()
         if self.fps_display:
             self.fps_display.draw()
 
@@ -239,6 +278,8 @@ class Main(pyglet.window.Window):
             self.high_score.mode = self.game.mode
             self.high_score.generate_scores()
         if symbol == key.ASCIITILDE:
+            for heart in self.game.hearts:
+                heart.sprite.delete()
             self.game.hearts = []
         if symbol == key.F:
             self.set_fullscreen(not self.fullscreen)
@@ -247,6 +288,8 @@ class Main(pyglet.window.Window):
         if self.fps_display:
             self.fps_display.label.y = self.height - 50
             self.fps_display.label.x = self.width - 170
+        if self.game:
+            self.game.resize(width, height)
         super(Main, self).on_resize(width, height)
 
     def setState(self, state):
@@ -255,6 +298,12 @@ class Main(pyglet.window.Window):
             self.focus.caret.visible = True
         else:
             self.focus = None
+        self.game.playing = state is self.PLAYING
+        if PERFORMANCE_MODE:
+            if state is self.PLAYING:
+                gc.disable()
+            else:
+                gc.enable()
         self.state = state
 
     def on_mouse_release(self, *args):
@@ -264,6 +313,8 @@ class Main(pyglet.window.Window):
             state = self.game.on_mouse_release(*args)
             if state is self.SCORE:
                 self.high_score.set_score(self.game.score)
+                self.stats.add(self.game.mode, self.game.score)
+                self.stats.save()
             self.setState(state)
 
     def on_text(self, text):
@@ -10,6 +10,8 @@ import pyglet
 from pyglet.window import key
 from pyglet import gl
 
+from stats import Statistics
+
 
 DEBUG_VERSION = False
 
@@ -168,6 +170,7 @@ class Main(pyglet.window.Window):
         self.score_labels[0].text = 'Distances:'
         self.score_labels[6].text = 'Total:'
         self.previous_scores = []
+        self.stats = Statistics('hearts2.stats')
         self.start()
 
     def start(self):
@@ -212,6 +215,8 @@ class Main(pyglet.window.Window):
             mapX, mapY = mapMapCoords(x, y)
             distance = math.hypot(mapX - self.heart.mapX, mapY - self.heart.mapY)
             self.scores.append(round(distance, 2))
+            self.stats.add((self.heart.mapX, self.heart.mapY), distance)
+            self.stats.save()
             self.heart.mapX, self.heart.mapY = random.randint(1, 12), random.randint(1, 12)
             self.left_ear.computeVolume()
             self.right_ear.computeVolume()
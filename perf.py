@@ -0,0 +1,57 @@
+try:
+    import tracemalloc
+except ImportError:
+    tracemalloc = None
+
+
+class AllocationCounter(object):
+    '''Counts bytes allocated during sections of code.
+
+    Uses the peak traced memory rather than the memory in use, so
+    temporaries that are freed again before stop() are counted too.
+    Objects CPython takes from its free lists (floats, small tuples)
+    need no new memory and are not counted: self.total_time += dt in
+    Heart.update makes a new float every frame and still counts zero.
+
+    Tracing runs from construction until close(), as it slows down every
+    allocation in the process.  Without tracemalloc.reset_peak() (before
+    Python 3.9) the counter is disabled and counts nothing.
+    '''
+
+    enabled = (tracemalloc is not None and
+               hasattr(tracemalloc, 'reset_peak'))
+
+    def __init__(self):
+        self.tracing = False
+        self.overhead = 0
+        self.reset()
+        if self.enabled:
+            if not tracemalloc.is_tracing():
+                tracemalloc.start()
+                self.tracing = True
+            # Measure what start() and stop() themselves leave behind
+            self.started = tracemalloc.get_traced_memory()[0]
+            self.start()
+            self.stop()
+            self.overhead = self.allocated
+            self.reset()
+
+    def reset(self):
+        self.allocated = 0
+        self.sections = 0
+
+    def start(self):
+        if self.enabled:
+            self.started = tracemalloc.get_traced_memory()[0]
+            tracemalloc.reset_peak()
+
+    def stop(self):
+        if self.enabled:
+            current, peak = tracemalloc.get_traced_memory()
+            self.allocated += peak - self.started - self.overhead
+        self.sections += 1
+
+    def close(self):
+        if self.tracing:
+            tracemalloc.stop()
+            self.tracing = False
@@ -0,0 +1,204 @@
+import bisect
+import errno
+import math
+import os
+import pickle
+
+
+def exact_quantile(values, p):
+    '''Quantile of sorted values, interpolating between neighbours.'''
+    if not values:
+        return None
+    h = (len(values) - 1) * p
+    lower = int(math.floor(h))
+    upper = min(lower + 1, len(values) - 1)
+    return values[lower] + (h - lower) * (values[upper] - values[lower])
+
+
+class Quantile(object):
+    '''Streaming estimate of a single quantile (the P-square algorithm).
+
+    Keeps five markers no matter how many values were added, so both
+    add() and value() take constant time and memory.  The markers start
+    from a sorted sample of at least five values instead of from the
+    first five, which makes high quantiles usable right away.
+    '''
+
+    def __init__(self, p, sample=None, state=None):
+        self.p = p
+        fractions = [0, p / 2.0, p, (1 + p) / 2.0, 1]
+        if state is None:
+            last = len(sample) - 1
+            self.desired = [1 + last * f for f in fractions]
+            self.positions = [int(round(d)) for d in self.desired]
+            for i in (1, 2, 3):
+                self.positions[i] = max(self.positions[i],
+                                        self.positions[i - 1] + 1)
+            self.positions[4] = last + 1
+            for i in (3, 2, 1):
+                self.positions[i] = min(self.positions[i],
+                                        self.positions[i + 1] - 1)
+            self.heights = [sample[n - 1] for n in self.positions]
+        else:
+            self.heights, self.positions, self.desired = [list(s) for s in state]
+        self.increments = fractions
+
+    def state(self):
+        return (tuple(self.heights), tuple(self.positions), tuple(self.desired))
+
+    def add(self, x):
+        q = self.heights
+        if x < q[0]:
+            q[0] = x
+            k = 0
+        elif x >= q[4]:
+            q[4] = x
+            k = 3
+        else:
+            k = 0
+            while x >= q[k + 1]:
+                k += 1
+        n = self.positions
+        for i in range(k + 1, 5):
+            n[i] += 1
+        for i in range(5):
+            self.desired[i] += self.increments[i]
+        for i in (1, 2, 3):
+            d = self.desired[i] - n[i]
+            if ((d >= 1 and n[i + 1] - n[i] > 1) or
+                (d <= -1 and n[i - 1] - n[i] < -1)):
+                d = 1 if d > 0 else -1
+                height = self.parabolic(i, d)
+                if not q[i - 1] < height < q[i + 1]:
+                    height = q[i] + d * (q[i + d] - q[i]) / float(n[i + d] - n[i])
+                q[i] = height
+                n[i] += d
+
+    def parabolic(self, i, d):
+        q, n = self.heights, self.positions
+        return q[i] + d / float(n[i + 1] - n[i - 1]) * (
+            (n[i] - n[i - 1] + d) * (q[i + 1] - q[i]) / float(n[i + 1] - n[i]) +
+            (n[i + 1] - n[i] - d) * (q[i] - q[i - 1]) / float(n[i] - n[i - 1]))
+
+    def value(self):
+        return self.heights[2]
+
+
+class Distribution(object):
+    '''Running count, mean, minimum, maximum and p50/p95/p99 of a series.
+
+    Up to sample_size values are kept sorted and give exact quantiles.
+    Once one more arrives, the sorted values seed one Quantile sketch
+    per percentile and are dropped.
+    '''
+
+    percentiles = (0.5, 0.95, 0.99)
+    sample_size = 100
+
+    def __init__(self, state=None):
+        if state is None:
+            self.count = 0
+            self.total = 0.0
+            self.min = None
+            self.max = None
+            self.sample = []
+            self.quantiles = []
+        else:
+            self.count, self.total, self.min, self.max, sample, quantiles = state
+            self.sample = list(sample)
+            self.quantiles = [Quantile(p, state=s)
+                              for p, s in zip(self.percentiles, quantiles)]
+
+    def state(self):
+        return (self.count, self.total, self.min, self.max, tuple(self.sample),
+                tuple(q.state() for q in self.quantiles))
+
+    def add(self, x):
+        self.count += 1
+        self.total += x
+        if self.min is None or x < self.min:
+            self.min = x
+        if self.max is None or x > self.max:
+            self.max = x
+        if self.quantiles:
+            for quantile in self.quantiles:
+                quantile.add(x)
+            return
+        bisect.insort(self.sample, x)
+        if len(self.sample) > self.sample_size:
+            self.quantiles = [Quantile(p, self.sample)
+                              for p in self.percentiles]
+            self.sample = []
+
+    @property
+    def mean(self):
+        if not self.count:
+            return None
+        return self.total / self.count
+
+    def quantile_values(self):
+        if not self.quantiles:
+            return [exact_quantile(self.sample, p) for p in self.percentiles]
+        values = []
+        lowest = self.min
+        for quantile in self.quantiles:
+            # Separate sketches can cross each other or leave the range
+            lowest = min(max(quantile.value(), lowest), self.max)
+            values.append(lowest)
+        return values
+
+    def summary(self):
+        result = dict(count=self.count, mean=self.mean,
+                      min=self.min, max=self.max)
+        for p, value in zip(self.percentiles, self.quantile_values()):
+            result['p%d' % round(p * 100)] = value
+        return result
+
+
+class Statistics(object):
+    '''Long-run distributions of game results, keyed by an arbitrary key.
+
+    Only the compact Distribution state is saved to stats_filename, at
+    most Distribution.sample_size raw values per key are kept, so queries
+    never replay history.
+    '''
+
+    def __init__(self, stats_filename):
+        self.stats_filename = stats_filename
+        self.distributions = {}
+        try:
+            self.load()
+        except (IOError, OSError) as e:
+            if e.errno != errno.ENOENT:
+                raise
+
+    def add(self, key, value):
+        distribution = self.distributions.get(key)
+        if distribution is None:
+            distribution = self.distributions[key] = Distribution()
+        distribution.add(value)
+
+    def summary(self, key):
+        distribution = self.distributions.get(key)
+        if distribution is None:
+            return Distribution().summary()
+        return distribution.summary()
+
+    def keys(self):
+        return sorted(self.distributions)
+
+    def load(self):
+        with open(self.stats_filename, 'rb') as f:
+            state = pickle.load(f)
+        self.distributions = dict((key, Distribution(s))
+                                  for key, s in state.items())
+
+    def save(self):
+        state = dict((key, d.state())
+                     for key, d in self.distributions.items())
+        # Write a copy and rename it over the old file, so a crash while
+        # saving never leaves a truncated file behind
+        tmp_filename = self.stats_filename + '.tmp'
+        with open(tmp_filename, 'wb') as f:
+            pickle.dump(state, f, 2)
+        getattr(os, 'replace', os.rename)(tmp_filename, self.stats_filename)
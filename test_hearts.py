@@ -0,0 +1,140 @@
+import importlib
+import sys
+import types
+
+import pytest
+
+from perf import AllocationCounter
+
+
+def stub_pyglet():
+    '''Just enough of pyglet to import hearts and run a level headless.
+
+    Nothing is drawn: Batch.draw() and the gl calls do nothing, so the
+    tests below cover the game's own Python code, not pyglet's.
+    '''
+
+    class Image(object):
+        width = 64
+        height = 64
+
+    class Sprite(object):
+        def __init__(self, image, batch=None):
+            self.image = image
+            self.x = self.y = 0
+            self.scale = 1.0
+
+        def set_position(self, x, y):
+            self.x, self.y = x, y
+
+        def delete(self):
+            pass
+
+    class Batch(object):
+        def draw(self):
+            pass
+
+    def noop(*args):
+        pass
+
+    pyglet = types.ModuleType('pyglet')
+    pyglet.resource = types.SimpleNamespace(
+        path=[], reindex=noop, image=lambda filename: Image())
+    pyglet.sprite = types.SimpleNamespace(Sprite=Sprite)
+    pyglet.graphics = types.SimpleNamespace(Batch=Batch)
+    pyglet.clock = types.SimpleNamespace(schedule_interval=noop)
+    pyglet.gl = types.SimpleNamespace(
+        glPushMatrix=noop, glPopMatrix=noop, glTranslatef=noop)
+    pyglet.window = types.ModuleType('pyglet.window')
+    pyglet.window.Window = object
+    pyglet.window.key = types.SimpleNamespace()
+    pyglet.window.mouse = types.SimpleNamespace(LEFT=1)
+    return pyglet
+
+
+@pytest.fixture
+def hearts(monkeypatch):
+    pyglet = stub_pyglet()
+    monkeypatch.setitem(sys.modules, 'pyglet', pyglet)
+    monkeypatch.setitem(sys.modules, 'pyglet.window', pyglet.window)
+    # Both import pyglet, drop them again so nothing keeps the stub
+    for name in ('hearts', 'high_score'):
+        monkeypatch.delitem(sys.modules, name, raising=False)
+    yield importlib.import_module('hearts')
+    for name in ('hearts', 'high_score'):
+        sys.modules.pop(name, None)
+
+
+@pytest.fixture
+def counter():
+    if not AllocationCounter.enabled:
+        pytest.skip('needs tracemalloc.reset_peak (Python 3.9)')
+    counter = AllocationCounter()
+    yield counter
+    counter.close()
+
+
+@pytest.fixture
+def game(hearts, counter, monkeypatch):
+    monkeypatch.setattr(hearts, 'PERFORMANCE_MODE', True)
+    game = hearts.Game(1024, 600, level=4)
+    game.allocations = counter
+    game.playing = True
+    return game
+
+
+def run_frames(game, frames):
+    for x in range(frames):
+        game.update(1 / 60.)
+        game.draw()
+
+
+def test_game_loop_does_not_allocate(game):
+    game.hearts[0].selected = True
+    run_frames(game, 5)
+    game.allocations.reset()
+    run_frames(game, 300)
+    assert game.allocations.sections == 600
+    assert game.allocations.allocated == 0
+
+
+def test_heart_update_does_not_allocate(hearts, counter):
+    heart = hearts.Heart(1, 2, 5)
+    for x in range(610):
+        if x == 10:
+            counter.reset()
+        heart.selected = x >= 310
+        counter.start()
+        heart.update(0.01)
+        counter.stop()
+    assert counter.sections == 600
+    assert counter.allocated == 0
+
+
+def test_counter_sees_freed_temporaries(hearts, counter):
+    counter.start()
+    for x in range(10):
+        with hearts.gl_matrix():
+            pass
+    counter.stop()
+    assert counter.allocated > 0
+
+
+def test_counts_only_while_playing(game):
+    game.playing = False
+    run_frames(game, 10)
+    assert game.allocations.sections == 0
+
+
+def test_start_resets_counter(game):
+    run_frames(game, 10)
+    assert game.allocations.sections == 20
+    game.start(1)
+    assert game.allocations.sections == 0
+
+
+def test_counter_stops_tracing(counter):
+    import tracemalloc
+    assert tracemalloc.is_tracing()
+    counter.close()
+    assert not tracemalloc.is_tracing()
@@ -0,0 +1,94 @@
+import os
+import random
+
+import pytest
+
+from stats import Distribution, Statistics, exact_quantile
+
+
+def fill(values):
+    distribution = Distribution()
+    for value in values:
+        distribution.add(value)
+    return distribution
+
+
+@pytest.mark.parametrize('n', [1, 2, 5, 6, 10, 20, 50, 100])
+def test_small_samples_are_exact(n):
+    values = [random.uniform(0, 10) for x in range(n)]
+    summary = fill(values).summary()
+    values.sort()
+    assert summary['p50'] == exact_quantile(values, 0.5)
+    assert summary['p95'] == exact_quantile(values, 0.95)
+    assert summary['p99'] == exact_quantile(values, 0.99)
+
+
+def test_high_quantiles_below_max():
+    summary = fill(range(7)).summary()
+    assert summary['p50'] == 3
+    assert 5 < summary['p95'] < summary['p99'] < summary['max'] == 6
+
+
+@pytest.mark.parametrize('n', [101, 1000, 20000])
+def test_large_samples_are_close(n):
+    rnd = random.Random(n)
+    values = [rnd.uniform(0, 10) for x in range(n)]
+    summary = fill(values).summary()
+    values.sort()
+    for p in Distribution.percentiles:
+        key = 'p%d' % round(p * 100)
+        assert abs(summary[key] - exact_quantile(values, p)) < 0.25
+    assert summary['p50'] <= summary['p95'] <= summary['p99'] <= summary['max']
+
+
+def test_summary():
+    summary = fill([1.0, 2.0, 6.0]).summary()
+    assert summary['count'] == 3
+    assert summary['mean'] == 3.0
+    assert summary['min'] == 1.0
+    assert summary['max'] == 6.0
+
+
+@pytest.fixture
+def stats_filename(tmpdir):
+    return str(tmpdir.join('test.stats'))
+
+
+@pytest.mark.parametrize('n', [3, 500])
+@pytest.mark.parametrize('key', [(3, 4), 'Normal'])
+def test_save_load(stats_filename, key, n):
+    stats = Statistics(stats_filename)
+    for x in range(n):
+        stats.add(key, x * 0.5)
+    stats.save()
+
+    loaded = Statistics(stats_filename)
+    assert loaded.keys() == [key]
+    assert loaded.summary(key) == stats.summary(key)
+
+    stats.add(key, 7.0)
+    loaded.add(key, 7.0)
+    assert loaded.summary(key) == stats.summary(key)
+
+
+def test_unknown_key(stats_filename):
+    summary = Statistics(stats_filename).summary('Expert')
+    assert summary == dict(count=0, mean=None, min=None, max=None,
+                           p50=None, p95=None, p99=None)
+
+
+def test_save_replaces_file(stats_filename):
+    stats = Statistics(stats_filename)
+    stats.add('Easy', 1.0)
+    stats.save()
+    stats.add('Easy', 2.0)
+    stats.save()
+    assert os.listdir(os.path.dirname(stats_filename)) == ['test.stats']
+    assert Statistics(stats_filename).summary('Easy')['count'] == 2
+
+
+def test_corrupt_file_is_not_ignored(stats_filename):
+    with open(stats_filename, 'wb') as f:
+        f.write(b'\x80\x02}q')
+    with pytest.raises(Exception):
+        Statistics(stats_filename)